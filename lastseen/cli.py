@@ -5,25 +5,33 @@ Offline VK dialog processor.
 
 Pipeline:
 1. Parse VK HTML archive (messages*.html)
-2. Collect messages in chronological order
-3. (Optional) Download media
-4. Export messages as chunked JSON:
-   - export/meta.json
-   - export/date_index.json
-   - export/pages/page_XXX.json
+2. Merge pages (and optional extra snapshots) in chronological order
+3. (Optional) Download media, optionally sized and budgeted first
+   (--media-plan / --max-media-bytes)
+4. Export messages as chunked JSON into a snapshot, published atomically:
+   - export/meta.json (points at the current snapshot)
+   - export/snapshots/<id>/date_index.json
+   - export/snapshots/<id>/authors.json
+   - export/snapshots/<id>/attachments/<type>_XXX.json
+   - export/snapshots/<id>/pages/page_XXX.json
+
+Subcommands:
+- watch: keep an export in sync with a dialog folder (see lastseen.watch)
+- serve: serve the viewer and fetch media on demand (see lastseen.downloader.proxy)
 """
 
 from __future__ import annotations
 
 import argparse
+import sys
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Sequence
 
-from tqdm import tqdm
-
-from lastseen.parser.vk_html import parse_messages_page
+from lastseen.parser.vk_html import find_message_pages, merge_dialog_folders
 from lastseen.downloader.media import download_dialog_media
-from lastseen.exporter.chunked_json import export_chunked_dialog
+from lastseen.downloader.plan import PRIORITIES, format_media_plan, parse_priority, plan_media
+from lastseen.downloader.proxy import parse_size
+from lastseen.exporter.chunked_json import DEFAULT_WORKERS, export_chunked_dialog
 
 
 # ------------------------------
@@ -34,31 +42,21 @@ def info(msg: str) -> None:
     print(f"[INFO] {msg}")
 
 
-def find_html_pages(dialog_dir: Path) -> List[Path]:
-    return sorted(dialog_dir.glob("messages*.html"))
-
-
 # ------------------------------
 # parsing
 # ------------------------------
 
-def parse_dialog(dialog_dir: Path) -> List[Dict[str, Any]]:
-    pages = find_html_pages(dialog_dir)
-    if not pages:
-        raise FileNotFoundError("No messages*.html files found")
-
-    info(f"Found {len(pages)} HTML pages")
+def parse_dialog(dialog_dirs: Sequence[Path]) -> List[Dict[str, Any]]:
+    """
+    Parse one or more snapshots of a dialog (oldest first).
 
-    all_messages: List[Dict[str, Any]] = []
+    Pages are k-way merged and deduplicated by message id,
+    later snapshots winning (see merge_dialog_folders).
+    """
+    pages = sum(len(find_message_pages(Path(d))) for d in dialog_dirs)
+    info(f"Found {pages} HTML pages")
 
-    for page in tqdm(
-        pages,
-        desc="Parsing message pages",
-        unit="page",
-        dynamic_ncols=True,
-    ):
-        messages = parse_messages_page(page)
-        all_messages.extend(messages)
+    all_messages = merge_dialog_folders(dialog_dirs)
 
     info(f"Total messages parsed: {len(all_messages)}")
     return all_messages
@@ -69,15 +67,40 @@ def parse_dialog(dialog_dir: Path) -> List[Dict[str, Any]]:
 # ------------------------------
 
 def main() -> None:
+    if sys.argv[1:2] == ["watch"]:
+        from lastseen.watch import main as watch_main
+
+        watch_main(sys.argv[2:])
+        return
+
+    if sys.argv[1:2] == ["serve"]:
+        from lastseen.downloader.proxy import main as serve_main
+
+        serve_main(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(
         prog="lastseen",
         description="Last Seen — offline VK dialog processor",
+        epilog=(
+            "subcommands:\n"
+            "  lastseen watch -i DIR [-o DIR]  keep an export in sync with a dialog folder\n"
+            "  lastseen serve [--port PORT]    serve the viewer and fetch media on demand\n"
+            "\n"
+            "Run 'lastseen watch --help' or 'lastseen serve --help' for their options."
+        ),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
     )
 
     parser.add_argument(
         "-i", "--input",
         required=True,
-        help="Path to dialog folder (e.g. samples/123456789)",
+        nargs="+",
+        help=(
+            "Path to dialog folder (e.g. samples/123456789). "
+            "Pass several snapshots of the same dialog, oldest first, "
+            "to merge them into one export"
+        ),
     )
 
     parser.add_argument(
@@ -94,42 +117,144 @@ def main() -> None:
     )
 
     parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Worker processes serializing pages (default: {DEFAULT_WORKERS})",
+    )
+
+    parser.add_argument(
+        "--html-fragments",
+        action="store_true",
+        help="Also write a pre-rendered HTML fragment per page for the viewer",
+    )
+
+    # how media is handled: download (default), skip, plan only, or proxy
+    media_mode = parser.add_mutually_exclusive_group()
+
+    media_mode.add_argument(
         "--no-media",
         action="store_true",
         help="Skip downloading media attachments",
     )
 
+    media_mode.add_argument(
+        "--media-plan",
+        action="store_true",
+        help=(
+            "Only size media with HEAD requests and print the download plan "
+            "(total, per type, already present); nothing is downloaded or exported"
+        ),
+    )
+
+    parser.add_argument(
+        "--max-media-bytes",
+        type=parse_size,
+        default=None,
+        help="Media download budget, e.g. 500M or 5G (default: unlimited)",
+    )
+
+    parser.add_argument(
+        "--media-priority",
+        type=parse_priority,
+        default=None,
+        help=(
+            "Which files fit the budget first: "
+            f"{' | '.join(PRIORITIES)} | comma-separated types "
+            "(e.g. voice_message,photo) (default: newest)"
+        ),
+    )
+
+    media_mode.add_argument(
+        "--media-proxy",
+        action="store_true",
+        help=(
+            "Do not download media; keep source URLs only and let "
+            "'lastseen serve' fetch files on demand into a size-capped cache"
+        ),
+    )
+
     args = parser.parse_args()
 
-    dialog_dir = Path(args.input)
+    budget_flags = args.max_media_bytes is not None or args.media_priority is not None
+    if budget_flags and (args.no_media or args.media_proxy):
+        parser.error(
+            "--max-media-bytes / --media-priority cannot be used with "
+            "--no-media or --media-proxy (nothing is downloaded)"
+        )
+    if args.media_priority is not None and args.max_media_bytes is None and not args.media_plan:
+        parser.error("--media-priority requires --max-media-bytes or --media-plan")
+    args.media_priority = args.media_priority or "newest"
+
+    dialog_dirs = [Path(p) for p in args.input]
     output_dir = Path(args.output)
 
     info("Last Seen — offline VK dialog processor")
-    info(f"Parsing dialog folder: {dialog_dir}")
+    for dialog_dir in dialog_dirs:
+        info(f"Parsing dialog folder: {dialog_dir}")
 
-    # 1. Parse messages
-    messages = parse_dialog(dialog_dir)
+    # 1. Parse (and merge) messages
+    messages = parse_dialog(dialog_dirs)
 
     # 2. Download media (optional)
+    if args.media_plan:
+        info("Planning media download (--media-plan)")
+        plan = plan_media(
+            messages,
+            out_dir=output_dir,
+            max_bytes=args.max_media_bytes,
+            priority=args.media_priority,
+        )
+        print(format_media_plan(plan))
+        info("Done")
+        return
+
     if args.no_media:
+        media = "none"
         info("Media download skipped (--no-media)")
+    elif args.media_proxy:
+        media = "proxy"
+        info("Media download skipped, files are fetched on demand (--media-proxy)")
     else:
+        media = "local"
+        only = None
+        if args.max_media_bytes is not None:
+            info("Sizing media for the download budget")
+            plan = plan_media(
+                messages,
+                out_dir=output_dir,
+                max_bytes=args.max_media_bytes,
+                priority=args.media_priority,
+            )
+            print(format_media_plan(plan))
+            only = plan.selected
+
         info("Downloading dialog media")
-        download_dialog_media(messages, out_dir=output_dir)
+        download_dialog_media(messages, out_dir=output_dir, only=only)
 
     # 3. Export chunked JSON + date index
     info("Exporting messages as chunked JSON")
 
-    export_chunked_dialog(
+    meta = export_chunked_dialog(
         messages,
         export_dir=output_dir,
         page_size=args.page_size,
+        media=media,
+        workers=args.workers,
+        html_fragments=args.html_fragments,
     )
 
+    snapshot_dir = output_dir / meta["snapshot"]
+
     info("Export completed")
     info(f"Meta file: {output_dir / 'meta.json'}")
-    info(f"Date index: {output_dir / 'date_index.json'}")
-    info(f"Pages dir : {output_dir / 'pages'}")
+    info(f"Snapshot : {snapshot_dir}")
+    info(f"Date index: {snapshot_dir / 'date_index.json'}")
+    info(f"Authors   : {snapshot_dir / 'authors.json'}")
+    info(f"Media list: {snapshot_dir / 'attachments'}")
+    info(f"Pages dir : {snapshot_dir / 'pages'}")
+    if args.html_fragments:
+        info(f"HTML dir  : {snapshot_dir / 'html'}")
     info("Done")
 
 
@@ -3,8 +3,19 @@ Last Seen — Downloader package
 ------------------------------
 Public API:
 - download_dialog_media
+- MediaCache, serve_media (on-demand media proxy)
+- plan_media, format_media_plan (preflight sizing and budget)
 """
 
 from .media import download_dialog_media
+from .plan import format_media_plan, plan_media
+from .proxy import MediaAllowlist, MediaCache, serve_media
 
-__all__ = ["download_dialog_media"]
+__all__ = [
+    "download_dialog_media",
+    "MediaCache",
+    "MediaAllowlist",
+    "serve_media",
+    "plan_media",
+    "format_media_plan",
+]
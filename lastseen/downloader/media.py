@@ -4,7 +4,9 @@ Last Seen — Media Downloader
 Handles downloading media attachments from parsed messages.
 
 Public API:
-- download_dialog_media(messages, out_dir)
+- download_dialog_media(messages, out_dir, only=None)
+- collect_media_tasks(messages, media_dir)
+- link_existing_media(messages, out_dir)
 """
 
 from __future__ import annotations
@@ -12,8 +14,9 @@ from __future__ import annotations
 import os
 import hashlib
 import requests
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set
 from urllib.parse import urlparse
 
 from tqdm import tqdm
@@ -27,26 +30,91 @@ def _safe_filename(url: str) -> str:
     return name
 
 
+@dataclass(frozen=True)
+class MediaTask:
+    url: str
+    target: Path
+    type: str
+    datetime: Optional[str]
+    attachment: Dict[str, Any]
+
+
+def collect_media_tasks(
+    messages: List[Dict[str, Any]],
+    media_dir: Path,
+) -> List[MediaTask]:
+    """
+    Every downloadable attachment with a source URL, in message order.
+    """
+    tasks = []
+
+    for msg in messages:
+        for att in msg.get("attachments", []):
+            url = att.get("source_url")
+            if not url or not att.get("downloadable"):
+                continue
+            tasks.append(MediaTask(
+                url=url,
+                target=media_dir / _safe_filename(url),
+                type=att.get("type", "unknown"),
+                datetime=msg.get("datetime"),
+                attachment=att,
+            ))
+
+    return tasks
+
+
+def link_existing_media(
+    messages: List[Dict[str, Any]],
+    out_dir: str | Path = "export",
+) -> int:
+    """
+    Set local_path for attachments whose file is already in out_dir/media,
+    without downloading anything.
+
+    Returns:
+        number of linked attachments
+    """
+    linked = 0
+    for task in collect_media_tasks(messages, Path(out_dir) / "media"):
+        if task.target.exists():
+            task.attachment["local_path"] = str(task.target)
+            linked += 1
+    return linked
+
+
 def _download_file(url: str, target: Path) -> bool:
+    """
+    Download into a .part file and rename it into place on success,
+    so an interrupted download never leaves a truncated target.
+    """
+    tmp = target.with_name(f".{target.name}.part")
     try:
         r = requests.get(url, stream=True, timeout=15)
         r.raise_for_status()
-        with open(target, "wb") as f:
+        with open(tmp, "wb") as f:
             for chunk in r.iter_content(chunk_size=8192):
                 if chunk:
                     f.write(chunk)
+        os.replace(tmp, target)
         return True
     except Exception:
         return False
+    finally:
+        tmp.unlink(missing_ok=True)
 
 
 def download_dialog_media(
     messages: List[Dict[str, Any]],
     out_dir: str | Path = "export",
+    only: Optional[Set[str]] = None,
 ) -> int:
     """
     Download all media attachments referenced in messages.
 
+    only restricts downloads to these source URLs (see plan_media);
+    files already on disk are always linked.
+
     Adds local_path to attachment entries if downloaded.
 
     Returns:
@@ -56,16 +124,7 @@ def download_dialog_media(
     media_dir = out_dir / "media"
     media_dir.mkdir(parents=True, exist_ok=True)
 
-    tasks = []
-
-    for msg in messages:
-        for att in msg.get("attachments", []):
-            url = att.get("url")
-            if not url:
-                continue
-            filename = _safe_filename(url)
-            target = media_dir / filename
-            tasks.append((url, target, att))
+    tasks = collect_media_tasks(messages, media_dir)
 
     if not tasks:
         print("[INFO] No media attachments found")
@@ -73,18 +132,21 @@ def download_dialog_media(
 
     downloaded = 0
 
-    for url, target, att in tqdm(
+    for task in tqdm(
         tasks,
         desc="Downloading media",
         unit="file",
         dynamic_ncols=True,
     ):
-        if target.exists():
-            att["local_path"] = str(target)
+        if task.target.exists():
+            task.attachment["local_path"] = str(task.target)
+            continue
+
+        if only is not None and task.url not in only:
             continue
 
-        if _download_file(url, target):
-            att["local_path"] = str(target)
+        if _download_file(task.url, task.target):
+            task.attachment["local_path"] = str(task.target)
             downloaded += 1
 
     print(f"[INFO] Downloaded {downloaded} new files")
@@ -0,0 +1,211 @@
+"""
+Last Seen — Media Preflight
+---------------------------
+Sizes a media run before anything is downloaded.
+
+Every downloadable attachment is sized with a HEAD request; requests
+run concurrently over a pooled session. Files already present in
+export/media are sized from disk. With a byte budget, a priority policy
+decides which new files fit:
+
+- "newest": newest messages first (default)
+- "oldest": oldest messages first
+- "voice_message,photo,...": by attachment type in the given order,
+  newest first within a type
+
+Files whose size the server does not report are never selected under
+a budget, so a run cannot overshoot it.
+
+Public API:
+- plan_media(messages, out_dir, max_bytes, priority, workers)
+- format_media_plan(plan)
+- parse_priority(text)
+"""
+
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+import requests
+from requests.adapters import HTTPAdapter
+from tqdm import tqdm
+
+from lastseen.attachments.taxonomy import ATTACHMENT_TYPES
+from lastseen.downloader.media import MediaTask, collect_media_tasks
+
+
+DEFAULT_HEAD_WORKERS = 16
+PRIORITIES = ("newest", "oldest")
+
+
+@dataclass
+class TypeStats:
+    files: int = 0
+    bytes: int = 0
+    present: int = 0
+    present_bytes: int = 0
+    unknown_size: int = 0
+    selected: int = 0
+    selected_bytes: int = 0
+
+
+@dataclass
+class MediaPlan:
+    max_bytes: Optional[int]
+    priority: str
+    by_type: Dict[str, TypeStats] = field(default_factory=dict)
+    selected: Set[str] = field(default_factory=set)
+
+    @property
+    def total(self) -> TypeStats:
+        total = TypeStats()
+        for stats in self.by_type.values():
+            for name in vars(total):
+                setattr(total, name, getattr(total, name) + getattr(stats, name))
+        return total
+
+
+def parse_priority(text: str) -> str:
+    """
+    Validate a priority policy; usable as an argparse type.
+    Raises argparse.ArgumentTypeError for unknown policies or types.
+    """
+    if text in PRIORITIES:
+        return text
+
+    keys = [key.strip() for key in text.split(",")]
+    unknown = [key for key in keys if key not in ATTACHMENT_TYPES]
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"unknown media priority {', '.join(unknown) or text!r}: expected "
+            f"{' or '.join(PRIORITIES)} or attachment types from "
+            f"{', '.join(ATTACHMENT_TYPES)}"
+        )
+    return ",".join(keys)
+
+
+def _head_size(session: requests.Session, url: str) -> Optional[int]:
+    try:
+        r = session.head(url, allow_redirects=True, timeout=15)
+        r.raise_for_status()
+        length = r.headers.get("Content-Length")
+        return int(length) if length is not None else None
+    except (requests.RequestException, ValueError):
+        return None
+
+
+def _priority_order(tasks: List[MediaTask], priority: str) -> List[MediaTask]:
+    newest_first = sorted(tasks, key=lambda t: t.datetime or "", reverse=True)
+
+    if priority == "newest":
+        return newest_first
+    if priority == "oldest":
+        return newest_first[::-1]
+
+    # by type: listed types first, in the given order; the rest after
+    ranks = {key: rank for rank, key in enumerate(priority.split(","))}
+    return sorted(newest_first, key=lambda t: ranks.get(t.type, len(ranks)))
+
+
+def plan_media(
+    messages: List[Dict[str, Any]],
+    out_dir: str | Path = "export",
+    max_bytes: Optional[int] = None,
+    priority: str = "newest",
+    workers: int = DEFAULT_HEAD_WORKERS,
+) -> MediaPlan:
+    """
+    Size all downloadable attachments and choose which to download.
+
+    Returns:
+        MediaPlan; plan.selected holds the source URLs to download
+    """
+    priority = parse_priority(priority)
+    media_dir = Path(out_dir) / "media"
+
+    # one task per distinct file
+    tasks: Dict[str, MediaTask] = {}
+    for task in collect_media_tasks(messages, media_dir):
+        tasks.setdefault(task.url, task)
+
+    present = {url for url, task in tasks.items() if task.target.exists()}
+    missing = [url for url in tasks if url not in present]
+
+    sizes: Dict[str, Optional[int]] = {url: tasks[url].target.stat().st_size for url in present}
+
+    if missing:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        with session, ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            results = pool.map(lambda url: _head_size(session, url), missing)
+            for url, size in tqdm(
+                zip(missing, results),
+                total=len(missing),
+                desc="Sizing media",
+                unit="file",
+                dynamic_ncols=True,
+            ):
+                sizes[url] = size
+
+    plan = MediaPlan(max_bytes=max_bytes, priority=priority)
+
+    for url, task in tasks.items():
+        stats = plan.by_type.setdefault(task.type, TypeStats())
+        size = sizes[url]
+        stats.files += 1
+        stats.bytes += size or 0
+        if url in present:
+            stats.present += 1
+            stats.present_bytes += size or 0
+        elif size is None:
+            stats.unknown_size += 1
+
+    budget = max_bytes
+    for task in _priority_order([tasks[url] for url in missing], priority):
+        size = sizes[task.url]
+        if budget is not None:
+            if size is None or size > budget:
+                continue
+            budget -= size
+
+        stats = plan.by_type[task.type]
+        stats.selected += 1
+        stats.selected_bytes += size or 0
+        plan.selected.add(task.url)
+
+    return plan
+
+
+def _fmt_bytes(n: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+def format_media_plan(plan: MediaPlan) -> str:
+    rows = [("type", "files", "size", "present", "unknown", "download")]
+    for key, s in sorted(plan.by_type.items()) + [("TOTAL", plan.total)]:
+        rows.append((
+            key,
+            str(s.files),
+            _fmt_bytes(s.bytes),
+            f"{s.present} ({_fmt_bytes(s.present_bytes)})",
+            str(s.unknown_size),
+            f"{s.selected} ({_fmt_bytes(s.selected_bytes)})",
+        ))
+
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    lines = ["  ".join(cell.ljust(w) for cell, w in zip(row, widths)) for row in rows]
+
+    budget = "unlimited" if plan.max_bytes is None else _fmt_bytes(plan.max_bytes)
+    lines.append(f"Budget: {budget}, priority: {plan.priority}")
+    return "\n".join(lines)
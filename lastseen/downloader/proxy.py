@@ -0,0 +1,356 @@
+"""
+Last Seen — Media Proxy
+-----------------------
+Serves the viewer and fetches media on demand.
+
+Instead of downloading every attachment up front, the export keeps only
+source URLs and the viewer requests /media?url=<source_url>. The first
+request fetches the file into an on-disk cache; later requests are served
+from disk. The cache has a size cap with LRU eviction, and concurrent
+requests for the same URL share a single fetch.
+
+Only source URLs of downloadable attachments listed in the current
+snapshot's attachment manifest are fetched; anything else gets 403,
+so the server cannot be used as an open proxy.
+
+Usage:
+    lastseen serve [--port 8000] [--cache-dir export/media_cache] [--cache-size 2G]
+
+Public API:
+- MediaCache
+- MediaAllowlist
+- serve_media(root, cache, host, port, export_dir)
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Set
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from lastseen.attachments.taxonomy import ATTACHMENT_TYPES
+from lastseen.downloader.media import _safe_filename
+from lastseen.exporter.chunked_json import current_snapshot
+
+
+DEFAULT_CACHE_SIZE = 2 * 1024 ** 3
+
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def parse_size(text: str) -> int:
+    """
+    '500M' -> 524288000, '2G' -> 2147483648, '1024' -> 1024
+    """
+    text = text.strip().upper().removesuffix("B")
+    unit = text[-1:] if text[-1:] in _SIZE_UNITS else ""
+    number = text[:-1] if unit else text
+    return int(float(number) * _SIZE_UNITS[unit])
+
+
+class MediaTooLarge(Exception):
+    """
+    The origin file does not fit into the cache size cap.
+    """
+
+
+class MediaCache:
+    """
+    Size-capped on-disk cache keyed by source URL.
+
+    Files are named by URL hash (keeping the original extension).
+    Recency survives restarts through file mtimes.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path,
+        max_bytes: int = DEFAULT_CACHE_SIZE,
+        session: Optional[requests.Session] = None,
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.session = session or requests.Session()
+
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+
+        # leftovers of fetches killed mid-download
+        for path in self.cache_dir.glob(".*.part"):
+            path.unlink(missing_ok=True)
+
+        existing = sorted(
+            (p for p in self.cache_dir.iterdir() if p.is_file() and not p.name.startswith(".")),
+            key=lambda p: p.stat().st_mtime,
+        )
+        for path in existing:
+            size = path.stat().st_size
+            self._entries[path.name] = size
+            self._total += size
+
+        # the cap may have been lowered since the last run
+        self._evict(keep=None)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+    def _name(self, url: str) -> str:
+        digest = hashlib.sha1(url.encode()).hexdigest()
+        return digest + Path(_safe_filename(url)).suffix[:10]
+
+    def get(self, url: str) -> Path:
+        """
+        Return the cached file for url, fetching it first if needed.
+        Raises requests.RequestException if the origin fetch fails and
+        MediaTooLarge if the file exceeds the cache cap.
+        """
+        name = self._name(url)
+        path = self.cache_dir / name
+
+        with self._lock:
+            if name in self._entries and path.exists():
+                self._entries.move_to_end(name)
+                os.utime(path)
+                return path
+
+            future = self._inflight.get(url)
+            owner = future is None
+            if owner:
+                future = self._inflight[url] = Future()
+
+        if not owner:
+            return future.result()
+
+        try:
+            size = self._fetch(url, path)
+            with self._lock:
+                self._total += size - self._entries.pop(name, 0)
+                self._entries[name] = size
+                self._evict(keep=name)
+            future.set_result(path)
+            return path
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(url, None)
+
+    def _fetch(self, url: str, path: Path) -> int:
+        tmp = path.with_name(f".{path.name}.{threading.get_ident()}.part")
+        try:
+            with self.session.get(url, stream=True, timeout=15) as r:
+                r.raise_for_status()
+                length = r.headers.get("Content-Length")
+                if length is not None and length.isdigit() and int(length) > self.max_bytes:
+                    raise MediaTooLarge(f"{url} is {length} bytes, cache cap is {self.max_bytes}")
+
+                received = 0
+                with open(tmp, "wb") as f:
+                    for chunk in r.iter_content(chunk_size=65536):
+                        if chunk:
+                            received += len(chunk)
+                            if received > self.max_bytes:
+                                raise MediaTooLarge(f"{url} exceeds cache cap of {self.max_bytes} bytes")
+                            f.write(chunk)
+            os.replace(tmp, path)
+        finally:
+            tmp.unlink(missing_ok=True)
+        return path.stat().st_size
+
+    def _evict(self, keep: Optional[str]) -> None:
+        """
+        Drop least recently used files until the cache fits its cap.
+        The file just fetched (keep) is never evicted (it fits the cap
+        on its own, see _fetch). Caller holds the lock.
+        """
+        for name in list(self._entries):
+            if self._total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            try:
+                (self.cache_dir / name).unlink(missing_ok=True)
+            except OSError:
+                # still being served (Windows); retry on a later eviction
+                continue
+            self._total -= self._entries.pop(name)
+
+
+class MediaAllowlist:
+    """
+    Source URLs of downloadable attachments in the current snapshot.
+
+    Reloaded whenever meta.json points at a different snapshot.
+    """
+
+    def __init__(self, export_dir: str | Path) -> None:
+        self.export_dir = Path(export_dir)
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Path] = None
+        self._urls: Set[str] = set()
+
+    def _load(self, snapshot: Path) -> Set[str]:
+        urls: Set[str] = set()
+        for key, atype in ATTACHMENT_TYPES.items():
+            if not atype.downloadable:
+                continue
+            for path in (snapshot / "attachments").glob(f"{key}_[0-9][0-9][0-9].json"):
+                with open(path, encoding="utf-8") as f:
+                    urls.update(
+                        item["source_url"]
+                        for item in json.load(f)["items"]
+                        if item.get("source_url")
+                    )
+        return urls
+
+    def __contains__(self, url: str) -> bool:
+        snapshot = current_snapshot(self.export_dir)
+        if snapshot is None:
+            return False
+
+        with self._lock:
+            if snapshot != self._snapshot:
+                self._urls = self._load(snapshot)
+                self._snapshot = snapshot
+            return url in self._urls
+
+
+class MediaProxyHandler(SimpleHTTPRequestHandler):
+    """
+    Static files from the project root + /media?url=<source_url>.
+    """
+
+    cache: MediaCache
+    allowlist: MediaAllowlist
+
+    def do_GET(self) -> None:
+        parsed = urlparse(self.path)
+        if parsed.path != "/media":
+            super().do_GET()
+            return
+
+        url = (parse_qs(parsed.query).get("url") or [""])[0]
+        if urlparse(url).scheme not in ("http", "https"):
+            self.send_error(HTTPStatus.BAD_REQUEST, "Expected ?url=<http(s) url>")
+            return
+
+        if url not in self.allowlist:
+            self.send_error(HTTPStatus.FORBIDDEN, "URL is not an attachment of the current export")
+            return
+
+        try:
+            path = self.cache.get(url)
+            f = open(path, "rb")
+        except (requests.RequestException, MediaTooLarge, OSError) as e:
+            self.send_error(HTTPStatus.BAD_GATEWAY, f"Fetch failed: {e}")
+            return
+
+        with f:
+            ctype = mimetypes.guess_type(_safe_filename(url))[0] or "application/octet-stream"
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+            self.send_header("Cache-Control", "max-age=86400")
+            self.end_headers()
+            shutil.copyfileobj(f, self.wfile)
+
+
+def make_media_server(
+    root: str | Path,
+    cache: MediaCache,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    export_dir: Optional[str | Path] = None,
+) -> ThreadingHTTPServer:
+    """
+    export_dir defaults to <root>/export.
+    """
+    allowlist = MediaAllowlist(export_dir if export_dir is not None else Path(root) / "export")
+    handler = type(
+        "BoundMediaProxyHandler",
+        (MediaProxyHandler,),
+        {"cache": cache, "allowlist": allowlist},
+    )
+    return ThreadingHTTPServer((host, port), partial(handler, directory=str(root)))
+
+
+def serve_media(
+    root: str | Path,
+    cache: MediaCache,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    export_dir: Optional[str | Path] = None,
+) -> None:
+    server = make_media_server(root, cache, host, port, export_dir)
+    print(f"[INFO] Serving {Path(root).resolve()} at http://{host}:{port}/viewer/index.html")
+    print(f"[INFO] Media cache: {cache.cache_dir} (cap {cache.max_bytes} bytes)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("[INFO] Server stopped")
+    finally:
+        server.server_close()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="lastseen serve",
+        description="Serve the viewer and fetch media on demand through a local cache",
+    )
+
+    parser.add_argument(
+        "--root",
+        default=".",
+        help="Directory containing viewer/ and export/ (default: .)",
+    )
+
+    parser.add_argument(
+        "--export",
+        default=None,
+        help="Export directory whose attachments may be fetched (default: <root>/export)",
+    )
+
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8000, help="Port (default: 8000)")
+
+    parser.add_argument(
+        "--cache-dir",
+        default="export/media_cache",
+        help="Media cache directory (default: ./export/media_cache)",
+    )
+
+    parser.add_argument(
+        "--cache-size",
+        type=parse_size,
+        default=DEFAULT_CACHE_SIZE,
+        help="Cache size cap, e.g. 500M or 2G (default: 2G)",
+    )
+
+    args = parser.parse_args(argv)
+
+    serve_media(
+        args.root,
+        MediaCache(args.cache_dir, args.cache_size),
+        host=args.host,
+        port=args.port,
+        export_dir=args.export,
+    )
@@ -0,0 +1,75 @@
+"""
+Last Seen — Attachment Manifest
+-------------------------------
+Builds:
+- export/attachments/index.json
+- export/attachments/<type>_XXX.json
+
+Attachments are grouped by AttachmentType key and paginated per type,
+so a gallery ("all photos", "all voice messages") loads incrementally
+without scanning message pages. Every item points back to its message
+by id and (page, offset) in export/pages.
+"""
+
+from __future__ import annotations
+
+from math import ceil
+from typing import Any, Dict, List
+
+from lastseen.attachments.taxonomy import ATTACHMENT_TYPES
+
+
+DEFAULT_MANIFEST_PAGE_SIZE = 200
+
+
+def group_attachments(
+    messages: List[Dict[str, Any]],
+    page_size: int,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Group attachments by type, in message order.
+    """
+    groups: Dict[str, List[Dict[str, Any]]] = {key: [] for key in ATTACHMENT_TYPES}
+
+    for global_idx, msg in enumerate(messages):
+        for att in msg.get("attachments", []):
+            key = att.get("type") if att.get("type") in groups else "unknown"
+            groups[key].append({
+                "message_id": msg["id"],
+                "page": global_idx // page_size,
+                "offset": global_idx % page_size,
+                "local_path": att.get("local_path"),
+                "source_url": att.get("source_url"),
+            })
+
+    return {key: items for key, items in groups.items() if items}
+
+
+def build_attachment_manifest(
+    messages: List[Dict[str, Any]],
+    page_size: int,
+    manifest_page_size: int = DEFAULT_MANIFEST_PAGE_SIZE,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Returns:
+        file name (relative to export/attachments) -> JSON payload,
+        including index.json
+    """
+    files: Dict[str, Dict[str, Any]] = {}
+    index: Dict[str, Any] = {"page_size": manifest_page_size, "types": {}}
+
+    for key, items in group_attachments(messages, page_size).items():
+        total_pages = ceil(len(items) / manifest_page_size)
+        index["types"][key] = {"count": len(items), "pages": total_pages}
+
+        for page in range(total_pages):
+            chunk = items[page * manifest_page_size:(page + 1) * manifest_page_size]
+            files[f"{key}_{page:03d}.json"] = {
+                "type": key,
+                "page": page,
+                "count": len(chunk),
+                "items": chunk,
+            }
+
+    files["index.json"] = index
+    return files
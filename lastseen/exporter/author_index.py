@@ -0,0 +1,71 @@
+"""
+Last Seen — Author Index
+------------------------
+Builds export/authors.json: one entry per author with message count,
+date range and the global positions of their messages.
+
+Positions are delta-encoded (first value absolute, then gaps), so the
+list stays small even for chatty authors. The viewer turns a position
+into (page, offset) with page_size from meta.json.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+
+def author_key(author: Dict[str, Any]) -> str:
+    if author.get("role") == "self":
+        return "self"
+    if author.get("vk_id") is not None:
+        return f"id{author['vk_id']}"
+    return f"name:{author.get('name') or ''}"
+
+
+def delta_encode(positions: List[int]) -> List[int]:
+    return [pos - prev for prev, pos in zip([0] + positions, positions)]
+
+
+def delta_decode(deltas: List[int]) -> List[int]:
+    positions: List[int] = []
+    total = 0
+    for delta in deltas:
+        total += delta
+        positions.append(total)
+    return positions
+
+
+def build_author_index(messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Build the author table. Messages must be sorted chronologically,
+    so positions come out ascending and dates need no comparison.
+    """
+    authors: Dict[str, Dict[str, Any]] = {}
+    positions: Dict[str, List[int]] = {}
+
+    for global_idx, msg in enumerate(messages):
+        author = msg.get("author") or {}
+        key = author_key(author)
+        date = msg["datetime"].split("T")[0] if msg.get("datetime") else None
+
+        entry = authors.get(key)
+        if entry is None:
+            entry = authors[key] = {
+                "key": key,
+                "vk_id": author.get("vk_id"),
+                "name": author.get("name"),
+                "role": author.get("role"),
+                "count": 0,
+                "date_range": {"from": date, "to": date},
+            }
+            positions[key] = []
+
+        entry["count"] += 1
+        entry["date_range"]["to"] = date
+        positions[key].append(global_idx)
+
+    table = sorted(authors.values(), key=lambda a: -a["count"])
+    for entry in table:
+        entry["positions"] = delta_encode(positions[entry["key"]])
+
+    return {"authors": table}
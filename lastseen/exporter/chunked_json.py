@@ -3,8 +3,23 @@ Last Seen — Chunked JSON Exporter
 ---------------------------------
 Writes:
 - export/meta.json
-- export/date_index.json
-- export/pages/page_XXX.json
+- export/snapshots/<id>/date_index.json
+- export/snapshots/<id>/authors.json
+- export/snapshots/<id>/attachments/index.json, <type>_XXX.json
+- export/snapshots/<id>/pages/page_XXX.json
+- export/snapshots/<id>/html/page_XXX.html (optional, see html_fragments)
+
+Every export is written into a staging snapshot directory, renamed into
+place, and published by atomically replacing meta.json, whose "snapshot"
+field names the current snapshot. Readers that load meta.json first
+always see a consistent export; a crashed run leaves the previous export
+untouched. Pages are serialized and written by a pool of worker
+processes (json encoding with indent holds the GIL, so threads would
+not overlap it).
+
+Superseded snapshots are kept for SNAPSHOT_GRACE_SECONDS so open
+viewers can keep reading them; staging directories of other runs are
+only removed once they have been idle for STALE_STAGING_SECONDS.
 
 Messages must be sorted chronologically (old -> new).
 """
@@ -12,37 +27,186 @@ Messages must be sorted chronologically (old -> new).
 from __future__ import annotations
 
 import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 from math import ceil
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
+
+from lastseen.exporter.attachment_manifest import build_attachment_manifest
+from lastseen.exporter.author_index import build_author_index
+from lastseen.exporter.html_fragments import render_page_fragment
 
 
 DEFAULT_PAGE_SIZE = 100
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
 
+SNAPSHOTS_DIR = "snapshots"
+SNAPSHOT_GRACE_SECONDS = 10 * 60
+STALE_STAGING_SECONDS = 60 * 60
 
-def export_chunked_dialog(
+
+
+# ------------------------------
+# helpers
+# ------------------------------
+
+def _dump_json(path: Path, data: Any, compact: bool = False) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        if compact:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        else:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def _write_json(path: Path, data: Any) -> None:
+    """
+    Write JSON atomically: readers see either the old or the new file.
+    """
+    tmp = path.with_name(f".{path.name}.tmp")
+    _dump_json(tmp, data)
+    os.replace(tmp, path)
+
+
+def _link_or_copy(src: Path, dst: Path) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _remove(path: Path) -> None:
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        path.unlink(missing_ok=True)
+
+
+def _page_path(pages_dir: Path, page: int, ext: str = "json") -> Path:
+    return pages_dir / f"page_{page:03d}.{ext}"
+
+
+def _write_attachment_manifest(
     messages: List[Dict[str, Any]],
-    export_dir: str | Path = "export",
-    page_size: int = DEFAULT_PAGE_SIZE,
-) -> Dict[str, Any]:
+    snapshot_dir: Path,
+    page_size: int,
+) -> None:
+    manifest_dir = snapshot_dir / "attachments"
+    manifest_dir.mkdir()
+
+    for name, data in build_attachment_manifest(messages, page_size).items():
+        _dump_json(manifest_dir / name, data)
+
+
+def current_snapshot(export_dir: str | Path) -> Optional[Path]:
     """
-    Export dialog messages into chunked JSON format + date index.
+    Snapshot directory referenced by the published meta.json, if any.
+    """
+    export_dir = Path(export_dir)
+    try:
+        with open(export_dir / "meta.json", encoding="utf-8") as f:
+            snapshot = json.load(f).get("snapshot")
+    except (OSError, ValueError):
+        return None
 
-    This function name MUST exist because CLI imports it.
+    if not snapshot or not (export_dir / snapshot).is_dir():
+        return None
+    return export_dir / snapshot
+
+
+def _remove_legacy_layout(export_dir: Path) -> None:
     """
-    if not messages:
-        raise ValueError("No messages to export")
+    Remove the files of the pre-snapshot layout (export/pages/page_XXX.json,
+    export/date_index.json). Only called when the previous meta.json had
+    no "snapshot" field, and only touches files that layout wrote.
+    """
+    (export_dir / "date_index.json").unlink(missing_ok=True)
 
-    export_dir = Path(export_dir)
     pages_dir = export_dir / "pages"
+    for path in pages_dir.glob("page_[0-9][0-9][0-9]*.json"):
+        path.unlink(missing_ok=True)
+    try:
+        pages_dir.rmdir()
+    except OSError:
+        # missing, or holds files we did not write
+        pass
 
-    export_dir.mkdir(parents=True, exist_ok=True)
-    pages_dir.mkdir(parents=True, exist_ok=True)
 
-    total_messages = len(messages)
-    total_pages = ceil(total_messages / page_size)
+def _last_activity(path: Path) -> float:
+    """
+    Latest mtime of a staging directory and its direct subdirectories
+    (page files land in pages/ and html/, not in the root).
+    """
+    mtimes = [path.stat().st_mtime]
+    mtimes.extend(p.stat().st_mtime for p in path.iterdir() if p.is_dir())
+    return max(mtimes)
+
+
+def _prune_snapshots(snapshots_dir: Path, current: Path) -> None:
+    """
+    Remove snapshots retired more than SNAPSHOT_GRACE_SECONDS ago and
+    staging directories idle for STALE_STAGING_SECONDS (crashed runs).
+    A retired snapshot's mtime is its retirement time (see _publish).
+    """
+    now = time.time()
+    for entry in snapshots_dir.iterdir():
+        if entry == current:
+            continue
+        try:
+            if entry.name.endswith(".staging"):
+                stale = now - _last_activity(entry) > STALE_STAGING_SECONDS
+            else:
+                stale = now - entry.stat().st_mtime > SNAPSHOT_GRACE_SECONDS
+        except FileNotFoundError:
+            continue
+        if stale:
+            _remove(entry)
+
 
-    # Build date index: first message of each date -> (page, offset)
+def _publish(
+    export_dir: Path,
+    staging: Path,
+    meta: Dict[str, Any],
+    previous: Optional[Path],
+) -> None:
+    """
+    Rename the staging snapshot into place and swap meta.json.
+
+    The previous snapshot is stamped with its retirement time so it
+    survives the grace period for readers that loaded the old meta.json.
+    An export in the pre-snapshot layout is cleaned up once replaced.
+    """
+    try:
+        with open(export_dir / "meta.json", encoding="utf-8") as f:
+            legacy = "snapshot" not in json.load(f)
+    except (OSError, ValueError):
+        legacy = False
+
+    final = staging.with_name(staging.name.removesuffix(".staging"))
+    os.rename(staging, final)
+
+    meta["snapshot"] = final.relative_to(export_dir).as_posix()
+    _write_json(export_dir / "meta.json", meta)
+
+    if previous is not None and previous.exists():
+        os.utime(previous)
+
+    _prune_snapshots(final.parent, final)
+
+    if legacy:
+        _remove_legacy_layout(export_dir)
+
+
+def build_date_index(
+    messages: List[Dict[str, Any]],
+    page_size: int,
+) -> Dict[str, Dict[str, int]]:
+    """
+    First message of each date -> (page, offset).
+    """
     date_index: Dict[str, Dict[str, int]] = {}
     for global_idx, msg in enumerate(messages):
         dt = msg.get("datetime")
@@ -54,38 +218,180 @@ def export_chunked_dialog(
                 "page": global_idx // page_size,
                 "offset": global_idx % page_size,
             }
+    return date_index
 
-    # Write pages
-    for page in range(total_pages):
-        start = page * page_size
-        end = min((page + 1) * page_size, total_messages)
-        chunk = messages[start:end]
-
-        out = {
-            "page": page,
-            "page_size": page_size,
-            "count": len(chunk),
-            "messages": chunk,
-        }
 
-        with open(pages_dir / f"page_{page:03d}.json", "w", encoding="utf-8") as f:
-            json.dump(out, f, ensure_ascii=False, indent=2)
-
-    # Meta
+def build_meta(
+    messages: List[Dict[str, Any]],
+    page_size: int,
+    media: str = "local",
+    html_fragments: bool = False,
+) -> Dict[str, Any]:
     date_from = messages[0]["datetime"].split("T")[0] if messages[0].get("datetime") else None
     date_to = messages[-1]["datetime"].split("T")[0] if messages[-1].get("datetime") else None
 
-    meta = {
-        "total_pages": total_pages,
-        "total_messages": total_messages,
+    return {
+        "total_pages": ceil(len(messages) / page_size),
+        "total_messages": len(messages),
         "page_size": page_size,
         "date_range": {"from": date_from, "to": date_to},
+        "media": media,
+        "html_fragments": html_fragments,
     }
 
-    with open(export_dir / "meta.json", "w", encoding="utf-8") as f:
-        json.dump(meta, f, ensure_ascii=False, indent=2)
 
-    with open(export_dir / "date_index.json", "w", encoding="utf-8") as f:
-        json.dump(date_index, f, ensure_ascii=False, indent=2)
+def build_page(
+    messages: List[Dict[str, Any]],
+    page: int,
+    page_size: int,
+) -> Dict[str, Any]:
+    chunk = messages[page * page_size:(page + 1) * page_size]
+    return {
+        "page": page,
+        "page_size": page_size,
+        "count": len(chunk),
+        "messages": chunk,
+    }
+
+
+# (json path, html path or None, page payload, media mode)
+_PageJob = Tuple[Path, Optional[Path], Dict[str, Any], str]
+
+
+def _write_page_jobs(jobs: List[_PageJob]) -> None:
+    """
+    Serialize and write a batch of pages. Runs in worker processes.
+    """
+    for json_path, html_path, payload, media in jobs:
+        _dump_json(json_path, payload)
+        if html_path is not None:
+            with open(html_path, "w", encoding="utf-8") as f:
+                f.write(render_page_fragment(payload["messages"], media))
+
+
+def _run_page_jobs(jobs: List[_PageJob], workers: int) -> None:
+    """
+    Spread page jobs over worker processes. Small batches (typical for
+    watch refreshes) are written in-process to skip pool start-up.
+    """
+    if workers <= 1 or len(jobs) <= workers:
+        _write_page_jobs(jobs)
+        return
+
+    batch = ceil(len(jobs) / (workers * 4))
+    batches = [jobs[i:i + batch] for i in range(0, len(jobs), batch)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(_write_page_jobs, batches))
+
+
+# ------------------------------
+# export
+# ------------------------------
+
+def export_chunked_dialog(
+    messages: List[Dict[str, Any]],
+    export_dir: str | Path = "export",
+    page_size: int = DEFAULT_PAGE_SIZE,
+    media: str = "local",
+    workers: int = DEFAULT_WORKERS,
+    html_fragments: bool = False,
+) -> Dict[str, Any]:
+    """
+    Export dialog messages into chunked JSON format + date index.
+
+    media is recorded in meta.json for the viewer:
+    "local" (downloaded files), "proxy" (fetched on demand by
+    `lastseen serve`) or "none".
+
+    html_fragments additionally writes a pre-rendered HTML fragment
+    per page for the viewer.
 
+    This function name MUST exist because CLI imports it.
+    """
+    meta, _ = update_chunked_dialog(
+        messages, None, export_dir, page_size, media, workers, html_fragments,
+    )
     return meta
+
+
+def update_chunked_dialog(
+    messages: List[Dict[str, Any]],
+    previous: Optional[List[Dict[str, Any]]],
+    export_dir: str | Path = "export",
+    page_size: int = DEFAULT_PAGE_SIZE,
+    media: str = "local",
+    workers: int = DEFAULT_WORKERS,
+    html_fragments: bool = False,
+) -> Tuple[Dict[str, Any], List[int]]:
+    """
+    Publish a new snapshot of the export.
+
+    Pages whose messages equal `previous` (the list the current
+    snapshot was built from) are hard-linked from the current snapshot
+    instead of being serialized again. Pass previous=None to write
+    every page. Indexes are rebuilt every time.
+
+    workers is the number of processes serializing pages.
+
+    Returns:
+        (meta, list of rewritten page numbers)
+    """
+    if not messages:
+        raise ValueError("No messages to export")
+
+    export_dir = Path(export_dir)
+    snapshots_dir = export_dir / SNAPSHOTS_DIR
+    snapshots_dir.mkdir(parents=True, exist_ok=True)
+
+    old_snapshot = current_snapshot(export_dir)
+    if old_snapshot is None:
+        previous = None
+
+    staging = snapshots_dir / f"{datetime.now():%Y%m%d-%H%M%S-%f}.staging"
+    pages_dir = staging / "pages"
+    pages_dir.mkdir(parents=True)
+    html_dir = staging / "html"
+    if html_fragments:
+        html_dir.mkdir()
+
+    meta = build_meta(messages, page_size, media, html_fragments)
+    total_pages = meta["total_pages"]
+
+    kinds = {"pages": "json", "html": "html"} if html_fragments else {"pages": "json"}
+
+    jobs: List[_PageJob] = []
+    rewritten: List[int] = []
+
+    try:
+        for page in range(total_pages):
+            start = page * page_size
+            end = (page + 1) * page_size
+
+            if previous is not None and messages[start:end] == previous[start:end]:
+                olds = {kind: _page_path(old_snapshot / kind, page, ext) for kind, ext in kinds.items()}
+                if all(old.exists() for old in olds.values()):
+                    for kind, old in olds.items():
+                        _link_or_copy(old, _page_path(staging / kind, page, kinds[kind]))
+                    continue
+
+            jobs.append((
+                _page_path(pages_dir, page),
+                _page_path(html_dir, page, "html") if html_fragments else None,
+                build_page(messages, page, page_size),
+                media,
+            ))
+            rewritten.append(page)
+
+        _run_page_jobs(jobs, workers)
+
+        _dump_json(staging / "date_index.json", build_date_index(messages, page_size))
+        # loaded up front by the viewer: keep the position lists compact
+        _dump_json(staging / "authors.json", build_author_index(messages), compact=True)
+        _write_attachment_manifest(messages, staging, page_size)
+    except BaseException:
+        _remove(staging)
+        raise
+
+    _publish(export_dir, staging, meta, old_snapshot)
+
+    return meta, rewritten
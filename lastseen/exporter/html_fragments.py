@@ -0,0 +1,98 @@
+"""
+Last Seen — Pre-rendered HTML fragments
+---------------------------------------
+Builds export/snapshots/<id>/html/page_XXX.html: the markup the viewer's
+renderMessages() would produce for a page, with day separators, author
+grouping (start / middle / end) and times already computed and all text
+escaped. The viewer inserts a fragment in one operation.
+
+Times are the HH:MM:SS part of the archive timestamp in both paths.
+Day separators carry the ISO day in data-day and are formatted in the
+viewer's locale (a few per page), so both paths look the same.
+
+JSON pages stay the canonical data; fragments are optional.
+"""
+
+from __future__ import annotations
+
+from html import escape
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+
+def _media_url(att: Dict[str, Any], media: str) -> Optional[str]:
+    if att.get("local_path"):
+        return "../" + att["local_path"].replace("\\", "/")
+    if media == "proxy" and att.get("source_url"):
+        return "/media?url=" + quote(att["source_url"], safe="")
+    return None
+
+
+def _render_attachment(att: Dict[str, Any], media: str) -> str:
+    url = _media_url(att, media)
+    label = escape(att.get("label") or att.get("type") or "")
+
+    if url and att.get("viewer") == "image":
+        return (
+            f'<img class="attachment-image" loading="lazy" '
+            f'src="{escape(url)}" alt="{label}">'
+        )
+
+    if url and att.get("viewer") == "audio":
+        return f'<audio controls preload="none" src="{escape(url)}"></audio>'
+
+    if att.get("source_url"):
+        return (
+            f'<a class="attachment-label" href="{escape(att["source_url"])}" '
+            f'target="_blank" rel="noopener">{label}</a>'
+        )
+
+    return f'<span class="attachment-label">{label}</span>'
+
+
+def render_page_fragment(messages: List[Dict[str, Any]], media: str = "local") -> str:
+    """
+    Render one page of messages. Mirrors renderMessages() in viewer/app.js.
+    """
+    parts: List[str] = []
+    last_day = None
+
+    for i, msg in enumerate(messages):
+        prev = messages[i - 1] if i > 0 else None
+        nxt = messages[i + 1] if i + 1 < len(messages) else None
+        author = msg.get("author") or {}
+        day, _, time = msg["datetime"].partition("T")
+
+        if day != last_day:
+            parts.append(f'<div class="time" data-day="{escape(day)}">{escape(day)}</div>')
+            last_day = day
+
+        same_prev = prev is not None and (prev.get("author") or {}).get("name") == author.get("name")
+        same_next = nxt is not None and (nxt.get("author") or {}).get("name") == author.get("name")
+
+        group = "start"
+        if same_prev and same_next:
+            group = "middle"
+        elif same_prev:
+            group = "end"
+
+        parts.append(f'<div class="message {escape(author.get("role") or "")} {group}">')
+
+        if not same_prev:
+            parts.append(f'<div class="message-meta">{escape(author.get("name") or "")}</div>')
+
+        if msg.get("text"):
+            parts.append(f'<div class="message-text">{escape(msg["text"])}</div>')
+
+        for att in msg.get("attachments", []):
+            parts.append(_render_attachment(att, media))
+
+        parts.append(
+            '<div class="hover-menu">'
+            f'<span class="hover-time">{escape(time[:8])}</span>'
+            '<button class="copy-btn">📋</button>'
+            '</div>'
+        )
+        parts.append("</div>")
+
+    return "\n".join(parts)
@@ -1,3 +1,15 @@
-from .vk_html import parse_messages_page, parse_dialog_folder
+from .merge import merge_message_runs
+from .vk_html import (
+    find_message_pages,
+    merge_dialog_folders,
+    parse_dialog_folder,
+    parse_messages_page,
+)
 
-__all__ = ["parse_messages_page", "parse_dialog_folder"]
+__all__ = [
+    "parse_messages_page",
+    "parse_dialog_folder",
+    "find_message_pages",
+    "merge_dialog_folders",
+    "merge_message_runs",
+]
@@ -0,0 +1,51 @@
+"""
+Snapshot merging.
+
+Combines messages from several archive snapshots of the same dialog
+into one chronological stream.
+
+Every parsed messages*.html page is treated as an already-sorted run,
+so snapshots are combined with a k-way merge instead of a full sort.
+Messages are deduplicated by VK message id; the copy from the latest
+snapshot wins, so edits made between snapshots are preserved.
+"""
+
+from __future__ import annotations
+
+import heapq
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+def message_sort_key(msg: Dict[str, Any]) -> Tuple[str, int]:
+    return msg.get("datetime") or "", msg["id"]
+
+
+def sorted_run(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Order a single page chronologically.
+
+    VK pages are usually already ordered (newest first), which timsort
+    handles in linear time.
+    """
+    return sorted(messages, key=message_sort_key)
+
+
+def merge_message_runs(runs: Iterable[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    K-way merge sorted message runs by (datetime, id).
+
+    Runs must be passed oldest snapshot first: when the same message id
+    occurs more than once, the last occurrence replaces earlier ones.
+    """
+    merged: List[Dict[str, Any]] = []
+    positions: Dict[int, int] = {}
+
+    for msg in heapq.merge(*runs, key=message_sort_key):
+        pos = positions.get(msg["id"])
+        if pos is None:
+            positions[msg["id"]] = len(merged)
+            merged.append(msg)
+        else:
+            merged[pos] = msg
+
+    return merged
@@ -10,12 +10,13 @@ import logging
 import re
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence
 
 from bs4 import BeautifulSoup
 from tqdm import tqdm
 
 from lastseen.attachments.taxonomy import ATTACHMENT_TYPES
+from lastseen.parser.merge import merge_message_runs, sorted_run
 
 logger = logging.getLogger(__name__)
 
@@ -52,6 +53,22 @@ def parse_datetime_ru(text: str) -> datetime:
     )
 
 
+def _page_number(path: Path) -> int:
+    match = re.search(r"(\d+)", path.stem)
+    return int(match.group(1)) if match else -1
+
+
+def find_message_pages(folder_path: Path) -> List[Path]:
+    """
+    Return messages*.html files in numeric order
+    (messages2 before messages10).
+    """
+    return sorted(
+        folder_path.glob("messages*.html"),
+        key=lambda p: (_page_number(p), p.name),
+    )
+
+
 def normalize_attachment(label: str, href: Optional[str]) -> Dict:
     label_lower = (label or "").lower()
 
@@ -177,23 +194,42 @@ def parse_messages_page(path: Path) -> List[Dict]:
 def parse_dialog_folder(folder_path: Path) -> List[Dict]:
     """
     Parse all messages*.html files in dialog folder.
-    tqdm is used ONLY here.
+    Single-folder case of merge_dialog_folders (which shows the tqdm bar).
     """
-    logger.info(f"Parsing dialog folder: {folder_path}")
+    return merge_dialog_folders([folder_path])
 
-    html_files = sorted(folder_path.glob("messages*.html"))
-    logger.info(f"Found {len(html_files)} HTML pages")
 
-    all_messages: List[Dict] = []
+def merge_dialog_folders(folder_paths: Sequence[Path]) -> List[Dict]:
+    """
+    Parse several archive snapshots of the same dialog into one
+    chronological list, deduplicated by message id.
+
+    Folders must be ordered oldest snapshot first.
+    Each page is an already-sorted run and runs are k-way merged.
 
-    for html_file in tqdm(
-        html_files,
-        desc="Parsing message pages",
-        unit="page"
-    ):
-        all_messages.extend(parse_messages_page(html_file))
+    Raises FileNotFoundError if a folder has no messages*.html files.
+    """
+    html_files: List[Path] = []
+    for folder_path in folder_paths:
+        logger.info(f"Parsing dialog folder: {folder_path}")
+        found = find_message_pages(Path(folder_path))
+        if not found:
+            raise FileNotFoundError(f"No messages*.html files found in {folder_path}")
+        html_files.extend(found)
+
+    logger.info(f"Found {len(html_files)} HTML pages")
 
-    all_messages.sort(key=lambda m: m["datetime"])
+    runs = [
+        sorted_run(parse_messages_page(html_file))
+        for html_file in tqdm(
+            html_files,
+            desc="Parsing message pages",
+            unit="page",
+            dynamic_ncols=True,
+        )
+    ]
+
+    all_messages = merge_message_runs(runs)
     logger.info(f"Total messages parsed: {len(all_messages)}")
 
     return all_messages
@@ -0,0 +1,210 @@
+"""
+Last Seen — Watch mode
+----------------------
+Keeps an export in sync with a dialog folder while it is being curated.
+
+Usage:
+    lastseen watch -i samples/123456789 [-o export]
+
+The process stays resident with parsers loaded and polls the folder.
+Only added or changed messages*.html pages are re-parsed; cached page
+runs are k-way merged and only export pages whose content changed are
+rewritten. Unchanged pages are hard-linked into the new snapshot, which
+is published atomically through meta.json.
+
+Media is not downloaded in watch mode; files already in export/media
+(from an earlier full run) are linked, other attachments keep their
+source URLs. A page that fails to parse (e.g. still being copied) is
+logged once and retried when its (mtime, size) changes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from lastseen.downloader.media import link_existing_media
+from lastseen.exporter.chunked_json import (
+    DEFAULT_PAGE_SIZE,
+    current_snapshot,
+    update_chunked_dialog,
+)
+from lastseen.logging import setup_logging
+from lastseen.parser.merge import merge_message_runs, sorted_run
+from lastseen.parser.vk_html import find_message_pages, parse_messages_page
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 0.5
+
+
+class DialogWatcher:
+    """
+    Incremental parser + exporter for one dialog (or several snapshots).
+
+    Page runs are cached by path and invalidated by (mtime, size).
+    """
+
+    def __init__(
+        self,
+        dialog_dirs: Sequence[Path],
+        export_dir: Path,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        html_fragments: bool = False,
+    ) -> None:
+        self.dialog_dirs = [Path(d) for d in dialog_dirs]
+        self.export_dir = Path(export_dir)
+        self.page_size = page_size
+        self.html_fragments = html_fragments
+
+        self._stamps: Dict[Path, Tuple[int, int]] = {}
+        self._runs: Dict[Path, List[Dict[str, Any]]] = {}
+        self._failed: Dict[Path, Tuple[int, int]] = {}
+        self._messages: Optional[List[Dict[str, Any]]] = None
+        self._snapshot: Optional[Path] = None
+
+    def _scan(self) -> List[Path]:
+        pages: List[Path] = []
+        for dialog_dir in self.dialog_dirs:
+            pages.extend(find_message_pages(dialog_dir))
+        return pages
+
+    def refresh(self) -> Optional[List[int]]:
+        """
+        Re-parse changed pages and update the export.
+
+        Returns:
+            rewritten page numbers, or None if nothing changed on disk
+        """
+        pages = self._scan()
+        changed = False
+
+        for page in pages:
+            try:
+                st = page.stat()
+            except FileNotFoundError:
+                continue
+            stamp = (st.st_mtime_ns, st.st_size)
+            if stamp in (self._stamps.get(page), self._failed.get(page)):
+                continue
+
+            try:
+                run = sorted_run(parse_messages_page(page))
+            except Exception as e:
+                # partially copied page: keep the old run, retry once it changes
+                logger.warning(f"Cannot parse {page.name}, will retry when it changes: {e}")
+                self._failed[page] = stamp
+                continue
+
+            self._failed.pop(page, None)
+            self._runs[page] = run
+            self._stamps[page] = stamp
+            changed = True
+
+        for page in set(self._failed) - set(pages):
+            del self._failed[page]
+
+        removed = set(self._runs) - set(pages)
+        for page in removed:
+            del self._runs[page]
+            del self._stamps[page]
+            changed = True
+
+        if not changed:
+            return None
+
+        messages = merge_message_runs(self._runs[p] for p in pages if p in self._runs)
+        if not messages:
+            logger.warning("No messages found, export left untouched")
+            return []
+
+        # Reuse pages only from the snapshot this watcher published;
+        # another run may have replaced it with different settings.
+        previous = self._messages
+        if self._snapshot is None or current_snapshot(self.export_dir) != self._snapshot:
+            previous = None
+
+        linked = link_existing_media(messages, self.export_dir)
+
+        meta, written = update_chunked_dialog(
+            messages,
+            previous,
+            export_dir=self.export_dir,
+            page_size=self.page_size,
+            media="local" if linked else "none",
+            html_fragments=self.html_fragments,
+        )
+        self._messages = messages
+        self._snapshot = self.export_dir / meta["snapshot"]
+        return written
+
+    def run(self, interval: float = DEFAULT_INTERVAL) -> None:
+        while True:
+            started = time.perf_counter()
+            written = self.refresh()
+            if written is not None:
+                logger.info(
+                    f"Export refreshed: {len(self._messages or [])} messages, "
+                    f"{len(written)} page(s) rewritten "
+                    f"in {time.perf_counter() - started:.2f}s"
+                )
+            time.sleep(interval)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="lastseen watch",
+        description="Keep an export in sync with a dialog folder",
+    )
+
+    parser.add_argument(
+        "-i", "--input",
+        required=True,
+        nargs="+",
+        help="Path to dialog folder(s), oldest snapshot first",
+    )
+
+    parser.add_argument(
+        "-o", "--output",
+        default="export",
+        help="Output directory (default: ./export)",
+    )
+
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=DEFAULT_PAGE_SIZE,
+        help=f"Messages per JSON page (default: {DEFAULT_PAGE_SIZE})",
+    )
+
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=DEFAULT_INTERVAL,
+        help=f"Polling interval in seconds (default: {DEFAULT_INTERVAL})",
+    )
+
+    parser.add_argument(
+        "--html-fragments",
+        action="store_true",
+        help="Also write a pre-rendered HTML fragment per page for the viewer",
+    )
+
+    args = parser.parse_args(argv)
+    setup_logging(logging.INFO)
+
+    watcher = DialogWatcher(
+        [Path(p) for p in args.input],
+        Path(args.output),
+        page_size=args.page_size,
+        html_fragments=args.html_fragments,
+    )
+
+    logger.info(f"Watching {', '.join(args.input)} (Ctrl+C to stop)")
+    try:
+        watcher.run(args.interval)
+    except KeyboardInterrupt:
+        logger.info("Watch stopped")
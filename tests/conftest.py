@@ -0,0 +1,43 @@
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def serve_in_thread(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+@pytest.fixture
+def origin(tmp_path):
+    """
+    Local stand-in for the VK CDN; records every GET path.
+    HEAD requests are answered with the file's Content-Length.
+    """
+    files = tmp_path / "origin"
+    files.mkdir()
+    for name, size in (("a.jpg", 4000), ("b.jpg", 4000), ("c.jpg", 4000), ("big.jpg", 50000)):
+        (files / name).write_bytes(b"x" * size)
+
+    hits = []
+    lock = threading.Lock()
+
+    class Handler(QuietHandler):
+        def do_GET(self):
+            with lock:
+                hits.append(self.path)
+            super().do_GET()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(Handler, directory=str(files)))
+    base = serve_in_thread(server)
+    yield base, hits
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,38 @@
+from lastseen.exporter.attachment_manifest import build_attachment_manifest
+
+
+def _att(atype, url):
+    return {"type": atype, "source_url": url, "local_path": None}
+
+
+def test_manifest_groups_by_type_and_paginates():
+    messages = [
+        {"id": 10 + i, "attachments": [_att("photo", f"http://x/p{i}.jpg")]}
+        for i in range(5)
+    ]
+    messages[3]["attachments"].append(_att("voice_message", "http://x/v.ogg"))
+    messages[4]["attachments"].append(_att("no_such_type", None))
+
+    files = build_attachment_manifest(messages, page_size=2, manifest_page_size=2)
+
+    assert files["index.json"]["types"] == {
+        "photo": {"count": 5, "pages": 3},
+        "voice_message": {"count": 1, "pages": 1},
+        "unknown": {"count": 1, "pages": 1},
+    }
+    assert sorted(files) == [
+        "index.json",
+        "photo_000.json", "photo_001.json", "photo_002.json",
+        "unknown_000.json",
+        "voice_message_000.json",
+    ]
+
+    voice = files["voice_message_000.json"]["items"][0]
+    assert voice == {
+        "message_id": 13,
+        "page": 1,
+        "offset": 1,
+        "local_path": None,
+        "source_url": "http://x/v.ogg",
+    }
+    assert files["photo_002.json"]["count"] == 1
@@ -0,0 +1,25 @@
+from lastseen.exporter.author_index import build_author_index, delta_decode, delta_encode
+
+
+def test_delta_roundtrip():
+    positions = [0, 3, 4, 10, 250]
+
+    assert delta_encode(positions) == [0, 3, 1, 6, 240]
+    assert delta_decode(delta_encode(positions)) == positions
+    assert delta_encode([]) == []
+
+
+def test_author_index_counts_and_positions():
+    def msg(author, day):
+        return {"author": author, "datetime": f"2020-01-{day:02d}T10:00:00"}
+
+    me = {"role": "self", "name": "Вы", "vk_id": None}
+    other = {"role": "other", "name": "Anna", "vk_id": 42}
+    messages = [msg(me, 1), msg(other, 2), msg(other, 3), msg(me, 4), msg(other, 5)]
+
+    authors = {a["key"]: a for a in build_author_index(messages)["authors"]}
+
+    assert authors["id42"]["count"] == 3
+    assert authors["id42"]["date_range"] == {"from": "2020-01-02", "to": "2020-01-05"}
+    assert delta_decode(authors["id42"]["positions"]) == [1, 2, 4]
+    assert delta_decode(authors["self"]["positions"]) == [0, 3]
@@ -0,0 +1,149 @@
+import copy
+import json
+import os
+import time
+
+import pytest
+
+from lastseen.exporter import chunked_json
+from lastseen.exporter.chunked_json import (
+    current_snapshot,
+    export_chunked_dialog,
+    update_chunked_dialog,
+)
+
+
+def _messages(n, text="hi"):
+    return [
+        {
+            "id": i,
+            "author": {"role": "self", "name": "Вы", "vk_id": None},
+            "datetime": f"2020-01-{i + 1:02d}T10:00:00",
+            "edited": False,
+            "text": f"{text} {i}",
+            "attachments": [],
+        }
+        for i in range(n)
+    ]
+
+
+def _snapshots(export_dir):
+    return sorted(p.name for p in (export_dir / "snapshots").iterdir())
+
+
+def test_export_publishes_snapshot_in_meta(tmp_path):
+    meta = export_chunked_dialog(_messages(5), export_dir=tmp_path, page_size=2)
+
+    with open(tmp_path / "meta.json", encoding="utf-8") as f:
+        published = json.load(f)
+    snapshot = tmp_path / published["snapshot"]
+
+    assert published == meta
+    assert current_snapshot(tmp_path) == snapshot
+    assert _snapshots(tmp_path) == [snapshot.name]
+    assert sorted(p.name for p in (snapshot / "pages").iterdir()) == [
+        "page_000.json", "page_001.json", "page_002.json",
+    ]
+    assert (snapshot / "date_index.json").exists()
+    assert (snapshot / "authors.json").exists()
+    assert (snapshot / "attachments" / "index.json").exists()
+
+
+def test_previous_snapshot_is_kept_for_the_grace_period(tmp_path, monkeypatch):
+    export_chunked_dialog(_messages(3), export_dir=tmp_path)
+    first = current_snapshot(tmp_path)
+    export_chunked_dialog(_messages(3, "edited"), export_dir=tmp_path)
+    second = current_snapshot(tmp_path)
+
+    chunked_json._prune_snapshots(tmp_path / "snapshots", second)
+    assert first.exists()
+
+    now = time.time()
+    monkeypatch.setattr(chunked_json.time, "time", lambda: now + chunked_json.SNAPSHOT_GRACE_SECONDS + 1)
+    chunked_json._prune_snapshots(tmp_path / "snapshots", second)
+
+    assert not first.exists()
+    assert second.exists()
+
+
+def test_only_idle_staging_directories_are_removed(tmp_path):
+    export_chunked_dialog(_messages(3), export_dir=tmp_path)
+    snapshots_dir = tmp_path / "snapshots"
+
+    live = snapshots_dir / "live.staging"
+    (live / "pages").mkdir(parents=True)
+    idle = snapshots_dir / "idle.staging"
+    (idle / "pages").mkdir(parents=True)
+    old = time.time() - chunked_json.STALE_STAGING_SECONDS - 1
+    for path in (idle / "pages", idle):
+        os.utime(path, (old, old))
+
+    chunked_json._prune_snapshots(snapshots_dir, current_snapshot(tmp_path))
+
+    assert live.exists()
+    assert not idle.exists()
+
+
+def test_failed_page_write_keeps_published_export(tmp_path, monkeypatch):
+    export_chunked_dialog(_messages(5), export_dir=tmp_path, page_size=2)
+    meta_before = (tmp_path / "meta.json").read_bytes()
+    snapshots_before = _snapshots(tmp_path)
+
+    def fail(jobs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(chunked_json, "_write_page_jobs", fail)
+    with pytest.raises(OSError):
+        export_chunked_dialog(_messages(5, "edited"), export_dir=tmp_path, page_size=2, workers=1)
+
+    assert (tmp_path / "meta.json").read_bytes() == meta_before
+    assert _snapshots(tmp_path) == snapshots_before
+
+
+def test_update_links_unchanged_pages(tmp_path):
+    old = _messages(6)
+    export_chunked_dialog(old, export_dir=tmp_path, page_size=2)
+    first = current_snapshot(tmp_path)
+
+    new = copy.deepcopy(old)
+    new[3]["text"] = "edited"
+    meta, rewritten = update_chunked_dialog(new, old, export_dir=tmp_path, page_size=2)
+    second = tmp_path / meta["snapshot"]
+
+    assert rewritten == [1]
+    for page in (0, 2):
+        name = f"page_{page:03d}.json"
+        assert os.path.samefile(first / "pages" / name, second / "pages" / name)
+    assert not os.path.samefile(first / "pages" / "page_001.json", second / "pages" / "page_001.json")
+    with open(second / "pages" / "page_001.json", encoding="utf-8") as f:
+        assert json.load(f)["messages"][1]["text"] == "edited"
+
+
+def test_legacy_layout_is_replaced_without_touching_user_files(tmp_path):
+    (tmp_path / "pages").mkdir()
+    (tmp_path / "pages" / "page_000.json").write_text("{}")
+    (tmp_path / "pages" / "notes.txt").write_text("mine")
+    (tmp_path / "attachments").mkdir()
+    (tmp_path / "attachments" / "contract.pdf").write_text("mine")
+    (tmp_path / "authors.json").write_text("mine")
+    (tmp_path / "date_index.json").write_text("{}")
+    (tmp_path / "meta.json").write_text('{"total_pages": 1}')
+
+    export_chunked_dialog(_messages(3), export_dir=tmp_path)
+
+    assert not (tmp_path / "pages" / "page_000.json").exists()
+    assert not (tmp_path / "date_index.json").exists()
+    assert (tmp_path / "pages" / "notes.txt").exists()
+    assert (tmp_path / "attachments" / "contract.pdf").exists()
+    assert (tmp_path / "authors.json").exists()
+
+
+def test_export_into_unrelated_directory_keeps_its_files(tmp_path):
+    (tmp_path / "pages").mkdir()
+    (tmp_path / "pages" / "page_000.json").write_text("mine")
+    (tmp_path / "date_index.json").write_text("mine")
+
+    export_chunked_dialog(_messages(3), export_dir=tmp_path)
+
+    assert (tmp_path / "pages" / "page_000.json").exists()
+    assert (tmp_path / "date_index.json").exists()
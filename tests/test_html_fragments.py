@@ -0,0 +1,72 @@
+import re
+
+from lastseen.exporter.html_fragments import render_page_fragment
+
+
+def _msg(msg_id, dt, name="Вы", text="", attachments=()):
+    return {
+        "id": msg_id,
+        "author": {"role": "other", "name": name, "vk_id": 1},
+        "datetime": dt,
+        "text": text,
+        "attachments": list(attachments),
+    }
+
+
+def test_fragment_escapes_text_names_labels_and_urls():
+    evil = '<script>"x" & y</script>'
+    html = render_page_fragment([
+        _msg(1, "2020-01-01T10:00:00", name=evil, text=evil, attachments=[
+            {
+                "type": "link",
+                "viewer": "link",
+                "source_url": 'https://example.com/?a=1&b="2"<',
+                "local_path": None,
+                "label": evil,
+            },
+            {
+                "type": "photo",
+                "viewer": "image",
+                "source_url": None,
+                "local_path": 'media/a"b<&.jpg',
+                "label": evil,
+            },
+        ]),
+    ])
+
+    assert "<script>" not in html
+    assert '"x"' not in html
+    assert "&lt;script&gt;&quot;x&quot; &amp; y&lt;/script&gt;" in html
+    assert 'href="https://example.com/?a=1&amp;b=&quot;2&quot;&lt;"' in html
+    assert 'src="../media/a&quot;b&lt;&amp;.jpg"' in html
+
+
+def test_fragment_groups_consecutive_messages_by_author():
+    html = render_page_fragment([
+        _msg(1, "2020-01-01T10:00:00", name="A"),
+        _msg(2, "2020-01-01T10:00:01", name="A"),
+        _msg(3, "2020-01-01T10:00:02", name="A"),
+        _msg(4, "2020-01-01T10:00:03", name="B"),
+    ])
+
+    groups = re.findall(r'<div class="message other (\w+)">', html)
+    assert groups == ["start", "middle", "end", "start"]
+    # the author name is shown once per group
+    assert html.count('<div class="message-meta">') == 2
+
+
+def test_fragment_adds_day_separator_on_each_day_change():
+    html = render_page_fragment([
+        _msg(1, "2020-01-01T23:59:59"),
+        _msg(2, "2020-01-02T00:00:00"),
+        _msg(3, "2020-01-02T10:00:00"),
+        _msg(4, "2020-01-05T10:00:00"),
+    ])
+
+    days = [line for line in html.splitlines() if line.startswith('<div class="time"')]
+    assert days == [
+        '<div class="time" data-day="2020-01-01">2020-01-01</div>',
+        '<div class="time" data-day="2020-01-02">2020-01-02</div>',
+        '<div class="time" data-day="2020-01-05">2020-01-05</div>',
+    ]
+    assert '<span class="hover-time">23:59:59</span>' in html
@@ -0,0 +1,18 @@
+from lastseen.downloader.media import download_dialog_media
+
+
+def test_failed_download_leaves_no_file(origin, tmp_path):
+    base, _ = origin
+    atts = [
+        {"type": "photo", "downloadable": True, "source_url": f"{base}/{name}", "local_path": None}
+        for name in ("a.jpg", "missing.jpg")
+    ]
+    messages = [{"id": 1, "datetime": "2020-01-01T10:00:00", "attachments": atts}]
+
+    assert download_dialog_media(messages, out_dir=tmp_path) == 1
+
+    media_dir = tmp_path / "media"
+    assert sorted(p.name for p in media_dir.iterdir()) == ["a.jpg"]
+    assert (media_dir / "a.jpg").stat().st_size == 4000
+    assert atts[0]["local_path"] == str(media_dir / "a.jpg")
+    assert atts[1]["local_path"] is None
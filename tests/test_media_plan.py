@@ -0,0 +1,91 @@
+import argparse
+
+import pytest
+
+from lastseen.downloader.plan import TypeStats, parse_priority, plan_media
+
+
+def test_parse_priority_accepts_policies_and_types():
+    assert parse_priority("newest") == "newest"
+    assert parse_priority("oldest") == "oldest"
+    assert parse_priority("voice_message, photo") == "voice_message,photo"
+
+
+@pytest.mark.parametrize("text", ["newset", "photos", "photo,videos", ""])
+def test_parse_priority_rejects_unknown_names(text):
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_priority(text)
+
+
+def _attachment_msg(day, atype, url):
+    return {
+        "id": day,
+        "datetime": f"2020-01-{day:02d}T10:00:00",
+        "attachments": [{
+            "type": atype,
+            "downloadable": True,
+            "source_url": url,
+            "local_path": None,
+        }],
+    }
+
+
+@pytest.fixture
+def dialog(origin, tmp_path):
+    """
+    a.jpg is already downloaded (1234 bytes on disk); missing.jpg is not
+    on the origin, so its size is unknown. Sizes on the origin: 4000 for
+    a/b/c, 50000 for big.
+    """
+    base, hits = origin
+    out_dir = tmp_path / "export"
+    (out_dir / "media").mkdir(parents=True)
+    (out_dir / "media" / "a.jpg").write_bytes(b"x" * 1234)
+
+    urls = {name: f"{base}/{name}" for name in ("a.jpg", "b.jpg", "c.jpg", "big.jpg", "missing.jpg")}
+    messages = [
+        _attachment_msg(1, "photo", urls["a.jpg"]),
+        _attachment_msg(2, "voice_message", urls["c.jpg"]),
+        _attachment_msg(3, "photo", urls["b.jpg"]),
+        _attachment_msg(4, "photo", urls["missing.jpg"]),
+        _attachment_msg(5, "photo", urls["big.jpg"]),
+    ]
+    return messages, out_dir, urls, hits
+
+
+def test_plan_sizes_with_head_and_counts_present_and_unknown(dialog):
+    messages, out_dir, urls, hits = dialog
+
+    plan = plan_media(messages, out_dir=out_dir, workers=4)
+
+    assert plan.by_type["photo"] == TypeStats(
+        files=4, bytes=1234 + 4000 + 50000, present=1, present_bytes=1234,
+        unknown_size=1, selected=3, selected_bytes=54000,
+    )
+    assert plan.by_type["voice_message"] == TypeStats(
+        files=1, bytes=4000, selected=1, selected_bytes=4000,
+    )
+    # without a budget every missing file is downloaded, unknown sizes included
+    assert plan.selected == {urls[n] for n in ("b.jpg", "c.jpg", "big.jpg", "missing.jpg")}
+    # sized with HEAD only, nothing downloaded
+    assert hits == []
+
+
+@pytest.mark.parametrize("priority, max_bytes, expected", [
+    ("newest", 6000, {"b.jpg"}),
+    ("oldest", 6000, {"c.jpg"}),
+    ("newest", 55000, {"big.jpg", "b.jpg"}),
+    ("oldest", 55000, {"c.jpg", "b.jpg"}),
+    ("voice_message,photo", 6000, {"c.jpg"}),
+    ("photo", 6000, {"b.jpg"}),
+    ("photo", 9000, {"b.jpg", "c.jpg"}),
+])
+def test_plan_selects_within_budget_by_priority(dialog, priority, max_bytes, expected):
+    messages, out_dir, urls, _ = dialog
+
+    plan = plan_media(messages, out_dir=out_dir, max_bytes=max_bytes, priority=priority, workers=4)
+
+    assert plan.selected == {urls[name] for name in expected}
+    assert plan.total.selected_bytes <= max_bytes
+    # unknown sizes never fit a budget
+    assert urls["missing.jpg"] not in plan.selected
@@ -0,0 +1,106 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from lastseen.downloader.proxy import MediaCache, MediaTooLarge, make_media_server
+from lastseen.exporter.chunked_json import export_chunked_dialog
+from tests.conftest import serve_in_thread
+
+
+def test_concurrent_gets_share_one_fetch(origin, tmp_path):
+    base, hits = origin
+    cache = MediaCache(tmp_path / "cache", max_bytes=100000)
+
+    with ThreadPoolExecutor(8) as pool:
+        paths = list(pool.map(lambda _: cache.get(f"{base}/a.jpg"), range(8)))
+
+    assert len(set(paths)) == 1
+    assert paths[0].read_bytes() == b"x" * 4000
+    assert hits == ["/a.jpg"]
+
+
+def test_lru_eviction_order(origin, tmp_path):
+    base, hits = origin
+    cache = MediaCache(tmp_path / "cache", max_bytes=9000)
+
+    a = cache.get(f"{base}/a.jpg")
+    b = cache.get(f"{base}/b.jpg")
+    cache.get(f"{base}/a.jpg")  # a becomes most recently used
+    c = cache.get(f"{base}/c.jpg")  # evicts b
+
+    assert a.exists() and c.exists() and not b.exists()
+    assert cache.total_bytes == 8000
+    assert hits == ["/a.jpg", "/b.jpg", "/c.jpg"]
+
+
+def test_file_larger_than_cap_is_not_cached(origin, tmp_path):
+    base, _ = origin
+    cache = MediaCache(tmp_path / "cache", max_bytes=12000)
+
+    with pytest.raises(MediaTooLarge):
+        cache.get(f"{base}/big.jpg")
+
+    assert cache.total_bytes == 0
+    assert list((tmp_path / "cache").iterdir()) == []
+
+
+def test_proxy_serves_manifest_urls_only(origin, tmp_path):
+    base, hits = origin
+    export_dir = tmp_path / "export"
+    messages = [
+        {
+            "id": i,
+            "author": {"role": "self", "name": "Вы", "vk_id": None},
+            "datetime": f"2020-01-01T10:00:0{i}",
+            "text": "",
+            "attachments": [{
+                "type": "photo",
+                "downloadable": True,
+                "viewer": "image",
+                "source_url": f"{base}/{name}",
+                "local_path": None,
+                "label": "Фотография",
+            }],
+        }
+        for i, name in enumerate(["a.jpg", "missing.jpg"])
+    ]
+    export_chunked_dialog(messages, export_dir=export_dir, media="proxy")
+
+    server = make_media_server(
+        tmp_path, MediaCache(tmp_path / "cache"), port=0, export_dir=export_dir,
+    )
+    server.RequestHandlerClass.log_message = lambda *args: None
+    proxy = serve_in_thread(server)
+
+    try:
+        ok = requests.get(f"{proxy}/media", params={"url": f"{base}/a.jpg"})
+        missing = requests.get(f"{proxy}/media", params={"url": f"{base}/missing.jpg"})
+        foreign = requests.get(f"{proxy}/media", params={"url": f"{base}/b.jpg"})
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert ok.status_code == 200 and ok.content == b"x" * 4000
+    assert missing.status_code == 502
+    assert foreign.status_code == 403
+    assert "/b.jpg" not in hits
+
+
+def test_startup_enforces_cap_and_drops_partial_files(origin, tmp_path):
+    base, _ = origin
+    cache_dir = tmp_path / "cache"
+    cache = MediaCache(cache_dir, max_bytes=100000)
+    a = cache.get(f"{base}/a.jpg")
+    b = cache.get(f"{base}/b.jpg")
+    c = cache.get(f"{base}/c.jpg")
+    for age, path in enumerate((c, b, a)):
+        os.utime(path, (1000 - age, 1000 - age))  # a oldest, c newest
+    (cache_dir / f".{a.name}.123.part").write_bytes(b"x" * 10)
+
+    restarted = MediaCache(cache_dir, max_bytes=9000)
+
+    assert restarted.total_bytes == 8000
+    assert not a.exists() and b.exists() and c.exists()
+    assert sorted(p.name for p in cache_dir.iterdir()) == sorted([b.name, c.name])
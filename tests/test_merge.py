@@ -0,0 +1,38 @@
+from lastseen.parser.merge import merge_message_runs, sorted_run
+
+
+def _msg(msg_id, dt, text="", edited=False):
+    return {"id": msg_id, "datetime": dt, "text": text, "edited": edited}
+
+
+def test_merge_interleaves_runs_chronologically():
+    a = [_msg(1, "2020-01-01T10:00:00"), _msg(3, "2020-01-01T12:00:00")]
+    b = [_msg(2, "2020-01-01T11:00:00"), _msg(4, "2020-01-01T13:00:00")]
+
+    merged = merge_message_runs([a, b])
+
+    assert [m["id"] for m in merged] == [1, 2, 3, 4]
+
+
+def test_merge_breaks_datetime_ties_by_id():
+    a = [_msg(7, "2020-01-01T10:00:00")]
+    b = [_msg(5, "2020-01-01T10:00:00")]
+
+    assert [m["id"] for m in merge_message_runs([a, b])] == [5, 7]
+
+
+def test_merge_dedups_by_id_latest_snapshot_wins():
+    old = [_msg(1, "2020-01-01T10:00:00", "draft"), _msg(2, "2020-01-01T11:00:00")]
+    new = [_msg(1, "2020-01-01T10:00:00", "fixed", edited=True), _msg(3, "2020-01-01T12:00:00")]
+
+    merged = merge_message_runs([old, new])
+
+    assert [m["id"] for m in merged] == [1, 2, 3]
+    assert merged[0]["text"] == "fixed"
+    assert merged[0]["edited"] is True
+
+
+def test_sorted_run_orders_newest_first_pages():
+    page = [_msg(3, "2020-01-03T00:00:00"), _msg(2, "2020-01-02T00:00:00"), _msg(1, "2020-01-01T00:00:00")]
+
+    assert [m["id"] for m in sorted_run(page)] == [1, 2, 3]
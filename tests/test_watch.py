@@ -0,0 +1,94 @@
+import json
+import logging
+import os
+
+import pytest
+
+from lastseen.watch import DialogWatcher
+
+
+def _page_html(messages):
+    body = "\n".join(
+        f'<div class="message" data-id="{msg_id}">'
+        f'<div class="message__header">Вы, {day} янв 2020 в 10:00:00</div>'
+        f"<div>{text}</div>"
+        f"</div>"
+        for msg_id, day, text in messages
+    )
+    return f"<html><body>{body}</body></html>"
+
+
+def _write_page(path, content):
+    path.write_bytes(content.encode("windows-1251"))
+    # make sure the (mtime, size) stamp changes even on coarse clocks
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def _read_page(export_dir, page):
+    with open(export_dir / "meta.json", encoding="utf-8") as f:
+        snapshot = json.load(f)["snapshot"]
+    with open(export_dir / snapshot / "pages" / f"page_{page:03d}.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def dialog(tmp_path):
+    """
+    Three pages of two messages each: ids 1..6 on days 1..6.
+    """
+    dialog_dir = tmp_path / "dialog"
+    dialog_dir.mkdir()
+    for n in range(3):
+        ids = (2 * n + 1, 2 * n + 2)
+        _write_page(dialog_dir / f"messages{n}.html", _page_html([(i, i, f"text {i}") for i in ids]))
+
+    watcher = DialogWatcher([dialog_dir], tmp_path / "export", page_size=2)
+    assert watcher.refresh() == [0, 1, 2]
+    return dialog_dir, watcher
+
+
+def test_unchanged_folder_returns_none(dialog):
+    _, watcher = dialog
+
+    assert watcher.refresh() is None
+
+
+def test_edited_page_rewrites_only_affected_export_pages(dialog):
+    dialog_dir, watcher = dialog
+
+    _write_page(dialog_dir / "messages1.html", _page_html([(3, 3, "edited"), (4, 4, "text 4")]))
+
+    assert watcher.refresh() == [1]
+    assert _read_page(watcher.export_dir, 1)["messages"][0]["text"] == "edited"
+    assert [m["id"] for m in _read_page(watcher.export_dir, 2)["messages"]] == [5, 6]
+
+
+def test_deleted_page_drops_its_messages(dialog):
+    dialog_dir, watcher = dialog
+
+    (dialog_dir / "messages1.html").unlink()
+
+    assert watcher.refresh() == [1]
+    with open(watcher.export_dir / "meta.json", encoding="utf-8") as f:
+        meta = json.load(f)
+    assert meta["total_messages"] == 4
+    assert [m["id"] for m in _read_page(watcher.export_dir, 1)["messages"]] == [5, 6]
+
+
+def test_broken_page_leaves_export_untouched(dialog, caplog):
+    dialog_dir, watcher = dialog
+    meta_before = (watcher.export_dir / "meta.json").read_bytes()
+
+    _write_page(dialog_dir / "messages1.html", '<div class="message" data-id="oops"></div>')
+
+    with caplog.at_level(logging.WARNING, logger="lastseen.watch"):
+        assert watcher.refresh() is None
+        assert watcher.refresh() is None
+
+    assert (watcher.export_dir / "meta.json").read_bytes() == meta_before
+    # reported once, not on every poll
+    assert len(caplog.records) == 1
+
+    _write_page(dialog_dir / "messages1.html", _page_html([(3, 3, "fixed"), (4, 4, "text 4")]))
+    assert watcher.refresh() == [1]
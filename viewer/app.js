@@ -1,16 +1,16 @@
+const EXPORT_ROOT = "../export/";
+
 let meta = null;
 let dateIndex = null;
+let authors = null;
 let currentPage = null;
 
 /* ---------- helpers ---------- */
 
+// archive timestamps are naive local time: HH:MM:SS is taken as is,
+// matching the pre-rendered fragments
 function formatTime(iso) {
-    const d = new Date(iso);
-    return d.toLocaleTimeString(undefined, {
-        hour: "2-digit",
-        minute: "2-digit",
-        second: "2-digit"
-    });
+    return iso.split("T")[1].slice(0, 8);
 }
 
 function formatDay(iso) {
@@ -22,6 +22,45 @@ function formatDay(iso) {
     });
 }
 
+function mediaUrl(att) {
+    if (att.local_path) return "../" + att.local_path.replace(/\\/g, "/");
+    if (meta.media === "proxy" && att.source_url) {
+        return `/media?url=${encodeURIComponent(att.source_url)}`;
+    }
+    return null;
+}
+
+function renderAttachment(att) {
+    const url = mediaUrl(att);
+
+    if (url && att.viewer === "image") {
+        const img = document.createElement("img");
+        img.className = "attachment-image";
+        img.loading = "lazy";
+        img.src = url;
+        img.alt = att.label || "";
+        return img;
+    }
+
+    if (url && att.viewer === "audio") {
+        const audio = document.createElement("audio");
+        audio.controls = true;
+        audio.preload = "none";
+        audio.src = url;
+        return audio;
+    }
+
+    const el = document.createElement(att.source_url ? "a" : "span");
+    el.className = "attachment-label";
+    el.textContent = att.label || att.type;
+    if (att.source_url) {
+        el.href = att.source_url;
+        el.target = "_blank";
+        el.rel = "noopener";
+    }
+    return el;
+}
+
 /* ---------- theme ---------- */
 
 function setupTheme() {
@@ -43,18 +82,58 @@ function setupTheme() {
 
 /* ---------- data ---------- */
 
+// meta.json names the published snapshot; everything else is read from it
+function exportUrl(path) {
+    const base = meta.snapshot ? `${EXPORT_ROOT}${meta.snapshot}/` : EXPORT_ROOT;
+    return base + path;
+}
+
 async function loadMeta() {
-    meta = await fetch("../export/meta.json").then(r => r.json());
+    meta = await fetch(`${EXPORT_ROOT}meta.json`).then(r => r.json());
+}
+
+// Old snapshots are removed after a grace period. If a file is gone,
+// re-read meta.json and retry once against the newly published snapshot.
+async function fetchExport(path, as = "json") {
+    for (let attempt = 0; ; attempt++) {
+        try {
+            const r = await fetch(exportUrl(path));
+            if (!r.ok) throw new Error(`${r.status} ${path}`);
+            return as === "json" ? await r.json() : await r.text();
+        } catch (e) {
+            const snapshot = meta.snapshot;
+            if (attempt > 0) throw e;
+            await loadMeta();
+            if (meta.snapshot === snapshot) throw e;
+            await loadDateIndex();
+            await loadAuthors();
+        }
+    }
 }
 
 async function loadDateIndex() {
-    dateIndex = await fetch("../export/date_index.json").then(r => r.json());
+    dateIndex = await fetchExport("date_index.json");
+}
+
+async function loadAuthors() {
+    try {
+        const data = await fetchExport("authors.json");
+        // positions are delta-encoded: first absolute, then gaps
+        authors = data.authors.map(a => {
+            let total = 0;
+            return { ...a, positions: a.positions.map(d => (total += d)) };
+        });
+    } catch (e) {
+        authors = null;
+    }
 }
 
 async function loadPage(page) {
-    return await fetch(
-        `../export/pages/page_${String(page).padStart(3, "0")}.json`
-    ).then(r => r.json());
+    return await fetchExport(`pages/page_${String(page).padStart(3, "0")}.json`);
+}
+
+async function loadPageHtml(page) {
+    return await fetchExport(`html/page_${String(page).padStart(3, "0")}.html`, "text");
 }
 
 /* ---------- render ---------- */
@@ -97,10 +176,15 @@ function renderMessages(messages) {
 
         if (msg.text) {
             const text = document.createElement("div");
+            text.className = "message-text";
             text.textContent = msg.text;
             bubble.appendChild(text);
         }
 
+        (msg.attachments || []).forEach(att => {
+            bubble.appendChild(renderAttachment(att));
+        });
+
         // hover menu
         const hover = document.createElement("div");
         hover.className = "hover-menu";
@@ -122,12 +206,39 @@ function renderMessages(messages) {
     });
 }
 
+// pre-rendered fragments come from the exporter (--html-fragments)
+function renderFragment(html) {
+    const container = document.querySelector(".messages");
+    container.innerHTML = html;
+
+    // only day separators are localized on the client
+    container.querySelectorAll(".time[data-day]").forEach(sep => {
+        sep.textContent = formatDay(`${sep.dataset.day}T00:00:00`);
+    });
+}
+
+function setupCopyButtons() {
+    // fragments carry no handlers: copy is delegated from the container
+    document.querySelector(".messages").addEventListener("click", e => {
+        const btn = e.target.closest(".copy-btn");
+        if (!btn || btn.onclick) return;
+        const text = btn.closest(".message").querySelector(".message-text");
+        navigator.clipboard.writeText(text ? text.textContent : "");
+    });
+}
+
 /* ---------- pagination ---------- */
 
 async function showPage(page) {
-    const data = await loadPage(page);
-    currentPage = page;
-    renderMessages(data.messages);
+    if (meta.html_fragments) {
+        const html = await loadPageHtml(page);
+        currentPage = page;
+        renderFragment(html);
+    } else {
+        const data = await loadPage(page);
+        currentPage = page;
+        renderMessages(data.messages);
+    }
 
     document.getElementById("page-label").textContent =
         `Page ${meta.total_pages - page} / ${meta.total_pages}`;
@@ -189,16 +300,79 @@ function setupDatePicker() {
     });
 }
 
+/* ---------- jump by author ---------- */
+
+async function showPosition(position) {
+    const page = Math.floor(position / meta.page_size);
+    const offset = position % meta.page_size;
+
+    if (page !== currentPage) await showPage(page);
+
+    const bubbles = document.querySelectorAll(".message");
+    document.querySelectorAll(".message.focused")
+        .forEach(b => b.classList.remove("focused"));
+
+    if (bubbles[offset]) {
+        bubbles[offset].classList.add("focused");
+        bubbles[offset].scrollIntoView({ behavior: "smooth", block: "center" });
+    }
+}
+
+function setupAuthorFilter() {
+    if (!authors) return;
+
+    const select = document.getElementById("author-filter");
+    const prev = document.getElementById("author-prev");
+    const next = document.getElementById("author-next");
+
+    authors.forEach(a => {
+        const opt = document.createElement("option");
+        opt.value = a.key;
+        opt.textContent = `${a.name} (${a.count})`;
+        select.appendChild(opt);
+    });
+
+    [select, prev, next].forEach(el => (el.hidden = false));
+
+    let cursor = -1;
+
+    // looked up by key: authors may be reloaded from a newer snapshot
+    function selectedPositions() {
+        const author = (authors || []).find(a => a.key === select.value);
+        return author ? author.positions : [];
+    }
+
+    function jump(step) {
+        if (select.value === "") return;
+        const positions = selectedPositions();
+        cursor = Math.min(Math.max(cursor + step, 0), positions.length - 1);
+        showPosition(positions[cursor]);
+    }
+
+    select.addEventListener("change", () => {
+        if (select.value === "") return;
+        // start from the newest message, like the dialog itself
+        cursor = selectedPositions().length;
+        jump(-1);
+    });
+
+    prev.onclick = () => jump(-1);
+    next.onclick = () => jump(1);
+}
+
 /* ---------- init ---------- */
 
 async function init() {
     await loadMeta();
     await loadDateIndex();
+    await loadAuthors();
 
     setupTheme();
     setupPagination();
+    setupCopyButtons();
     setupStickyDate();
     setupDatePicker();
+    setupAuthorFilter();
 
     await showPage(meta.total_pages - 1);
 }